@@ -5,21 +5,22 @@ Agentic AI system for automated NIST compliance monitoring and reporting
 """
 
 import asyncio
+import functools
+import hashlib
 import logging
 import os
+import re
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import List, Dict, Optional
-import json
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request
 from pydantic import BaseModel
 import uvicorn
-import openai
-import requests
-from bs4 import BeautifulSoup
-import markdown
-from github import Github, Auth
-import yaml
+import httpx
+import diskcache
+import orjson
+from selectolax.lexbor import LexborHTMLParser
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -34,14 +35,137 @@ class Config:
     GITHUB_REPO = os.getenv("GITHUB_REPO", "your-org/nist-compliance-reports")
     SEARCH_ENGINE_ID = os.getenv("SEARCH_ENGINE_ID")
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+    OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    
+    # Set to false to skip scraping and serve demo data without any network I/O
+    USE_LIVE_SOURCES = os.getenv("USE_LIVE_SOURCES", "true").lower() == "true"
+    
+    # Set to true to score relevance and write summaries with OpenAI; off by default
+    # to avoid per-run API costs and keep published reports consistent
+    USE_AI_ANALYSIS = os.getenv("USE_AI_ANALYSIS", "false").lower() == "true"
     
     # NIST-specific search parameters
     NIST_BASE_URL = "https://csrc.nist.gov"
-    NIST_SEARCH_TERMS = [
+    NIST_SEARCH_TERMS = (
         "NIST SP 800-53", "NIST SP 800-171", "NIST SP 800-218",
         "cybersecurity framework", "secure software development",
         "supply chain security", "SSDF"
-    ]
+    )
+    
+    # HTTP client tuning
+    HTTP_RETRIES = 3
+    HTTP_BACKOFF_FACTOR = 0.3
+    HTTP_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    SEARCH_CONCURRENCY = 5
+    EXTRACT_CONCURRENCY = int(os.getenv("EXTRACT_CONCURRENCY", "10"))
+    
+    # On-disk cache for scraped NIST results (content changes weekly at most)
+    CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+    CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", str(12 * 60 * 60)))
+    
+    # Article bodies are truncated to 50 KB of text, so stop downloading well before that
+    MAX_ARTICLE_BYTES = int(os.getenv("MAX_ARTICLE_BYTES", "200000"))
+
+# Keywords used for relevance scoring
+RELEVANCE_KEYWORDS = (
+    'software', 'development', 'sdlc', 'ci/cd', 'devops', 'pipeline',
+    'container', 'cloud', 'security', 'secure', 'sast', 'dast', 'sbom',
+    'supply chain', 'cui', 'pii', 'authentication', 'access', 'control',
+    'nist', 'framework', 'cybersecurity', 'compliance', 'controls',
+    'sp 800', '800-53', '800-171', '800-218', 'ssdf', 'guidance'
+)
+
+# Rubric for AI relevance scoring; kept constant so it is a cacheable prompt prefix
+# and cached judgments stay valid
+RELEVANCE_SYSTEM_PROMPT = (
+    "You rate how relevant a NIST publication update is to IT and software development teams "
+    "(secure SDLC, CI/CD, DevOps, cloud, containers, supply chain, SBOM, access control) "
+    "on a scale from 0 (irrelevant) to 1 (directly actionable)."
+)
+
+# Instructions for AI summaries; byte-identical across runs (no dates or counts) so
+# providers can serve the prefix from their prompt cache
+SUMMARY_SYSTEM_PROMPT = """You are a compliance analyst writing for IT and software development teams.
+You will receive a JSON array of recent NIST SP 800-series publications with their title, URL,
+date, source, relevance score, summary and an excerpt of their content.
+
+Write a Markdown report with exactly these sections, in this order:
+
+# NIST Compliance Update Summary
+
+## Executive Summary
+Two or three paragraphs on what changed and why it matters for software development organizations.
+
+## Latest Updates
+One subsection per publication with its date, its URL and the key points for IT teams
+(secure SDLC, CI/CD pipeline security, DevOps, cloud and container security, supply chain, SBOM,
+authentication and access control).
+
+## Action Items
+Markdown checklist items ("- [ ] ...") grouped into immediate (0-30 days), short-term
+(1-3 months) and long-term (3-12 months) actions.
+
+## Control Mappings
+The relevant NIST SP 800-53 controls, SP 800-171 requirements and SSDF (SP 800-218) practices.
+
+## Source Citations
+A numbered list of Markdown links to every publication provided.
+
+Only use facts from the provided publications; do not invent publication numbers, dates or URLs.
+Do not add YAML frontmatter or a generation timestamp."""
+
+# Demo NIST data used when live sources are disabled or return too few results
+DEMO_NIST_ARTICLES = [
+    {
+        'title': 'NIST SP 800-218A: Secure Software Development Framework (SSDF) v1.1',
+        'url': 'https://csrc.nist.gov/publications/detail/sp/800-218a/final',
+        'date': '2024-12-01',
+        'summary': 'This document provides guidance on implementing secure software development practices throughout the software development life cycle (SDLC), including CI/CD pipeline security, supply chain security, and SBOM requirements.',
+        'source': 'NIST CSRC (Demo)',
+        'content': 'This publication provides updated guidance for implementing secure software development practices, with enhanced focus on CI/CD pipeline security, supply chain security, SBOM requirements, container security, and DevOps integration.'
+    },
+    {
+        'title': 'NIST Cybersecurity Framework 2.0: Updated Implementation Guidance',
+        'url': 'https://csrc.nist.gov/cyberframework/framework',
+        'date': '2024-11-15',
+        'summary': 'Major update to the NIST Cybersecurity Framework with new guidance for cloud environments, IoT security, and supply chain risk management.',
+        'source': 'NIST CSRC (Demo)',
+        'content': 'The updated framework includes new core functions for cybersecurity governance, cloud security guidance, supply chain subcategories, and expanded coverage for operational technology and IoT.'
+    },
+    {
+        'title': 'NIST SP 800-53 Rev 5: Security Controls for Federal Information Systems',
+        'url': 'https://csrc.nist.gov/publications/detail/sp/800-53/rev-5/final',
+        'date': '2024-10-30',
+        'summary': 'Updated security controls with new guidance for DevOps, cloud computing, and mobile device security.',
+        'source': 'NIST CSRC (Demo)',
+        'content': 'Security controls for software development environments including continuous monitoring requirements, automated security testing integration, configuration management controls, and access control for development environments.'
+    }
+]
+
+# Article containers in priority order, falling back to <body>
+ARTICLE_CONTENT_SELECTORS = (
+    'main', 'article', '.content', '.post-content',
+    '.entry-content', '#content', '.publication-detail'
+)
+
+# Search result titles that look like NIST publications
+PUBLICATION_TITLE_RE = re.compile(r'sp 800|special publication|cybersecurity|framework', re.IGNORECASE)
+
+def _decode_html(body: bytes, encoding: Optional[str]) -> str:
+    """Decode a page with its declared charset; lexbor would otherwise assume UTF-8"""
+    try:
+        return body.decode(encoding or 'utf-8', errors='replace')
+    except LookupError:
+        return body.decode('utf-8', errors='replace')
+
+@functools.lru_cache(maxsize=1024)
+def _count_keyword_matches(title: str, summary: str, content: str) -> int:
+    """Count relevance keywords present in an article's text"""
+    text = f"{title} {summary} {content}".lower()
+    # Plain substring scans rather than one regex alternation: overlapping keywords
+    # ('control'/'controls', 'sp 800'/'800-53') must each count, and on ~1 KB of
+    # text the C substring search is several times faster than re.findall
+    return sum(1 for keyword in RELEVANCE_KEYWORDS if keyword in text)
 
 # Pydantic models for API
 class WorkflowRequest(BaseModel):
@@ -54,19 +178,32 @@ class WorkflowResponse(BaseModel):
     pr_url: str
     articles_processed: int
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up the shared agent before serving traffic and close it on shutdown"""
+    async with NISTComplianceAgent() as agent:
+        app.state.agent = agent
+        yield
+
 # Initialize FastAPI app
-app = FastAPI(title="NIST Compliance Workflow", version="1.0.0")
+app = FastAPI(title="NIST Compliance Workflow", version="1.0.0", lifespan=lifespan)
 
 class NISTComplianceAgent:
     """Main agent class for NIST compliance workflow"""
     
     def __init__(self):
-        # Initialize clients with error handling for testing
+        # Initialize clients with error handling for testing; the SDKs are only
+        # imported when configured since they are slow to import
         try:
-            self.openai_client = openai.OpenAI(api_key=Config.OPENAI_API_KEY) if Config.OPENAI_API_KEY else None
+            if Config.OPENAI_API_KEY:
+                import openai
+                self.openai_client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
+            else:
+                self.openai_client = None
             
             # Use updated GitHub authentication
             if Config.GITHUB_TOKEN:
+                from github import Github, Auth
                 auth = Auth.Token(Config.GITHUB_TOKEN)
                 self.github_client = Github(auth=auth)
             else:
@@ -77,99 +214,135 @@ class NISTComplianceAgent:
             self.openai_client = None
             self.github_client = None
         
-        self.session = requests.Session()
+        # Shared async client so concurrent searches reuse pooled HTTP/2 connections;
+        # the transport also retries failed connection attempts
+        self.http = httpx.AsyncClient(
+            timeout=30,
+            headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=Config.HTTP_RETRIES,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30)
+            )
+        )
+        self._search_semaphore = asyncio.Semaphore(Config.SEARCH_CONCURRENCY)
+        self._extract_semaphore = asyncio.Semaphore(Config.EXTRACT_CONCURRENCY)
+        
+        # Search results and article bodies keyed on (endpoint, term/url)
+        self.cache = diskcache.Cache(os.path.join(Config.CACHE_DIR, 'nist'))
+        # Temperature-0 relevance judgments keyed on a hash of model and prompt
+        self.relevance_cache = diskcache.Cache(os.path.join(Config.CACHE_DIR, 'relevance'))
+    
+    async def aclose(self):
+        """Close the shared HTTP client and its pooled connections"""
+        await self.http.aclose()
+        self.cache.close()
+        self.relevance_cache.close()
+    
+    async def __aenter__(self) -> "NISTComplianceAgent":
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+    
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        """GET with exponential backoff on rate limiting and transient server errors"""
+        for attempt in range(Config.HTTP_RETRIES + 1):
+            response = await self.http.get(url, **kwargs)
+            logger.debug(f"GET {url} -> {response.status_code} ({response.http_version})")
+            if response.status_code not in Config.HTTP_RETRY_STATUSES or attempt == Config.HTTP_RETRIES:
+                return response
+            await asyncio.sleep(Config.HTTP_BACKOFF_FACTOR * 2 ** attempt)
     
     async def _get_demo_nist_data(self, limit: int = 10) -> List[Dict]:
         """Provide demo NIST data for testing when APIs are unavailable"""
-        demo_articles = [
-            {
-                'title': 'NIST SP 800-218A: Secure Software Development Framework (SSDF) v1.1',
-                'url': 'https://csrc.nist.gov/publications/detail/sp/800-218a/final',
-                'date': '2024-12-01',
-                'summary': 'This document provides guidance on implementing secure software development practices throughout the software development life cycle (SDLC), including CI/CD pipeline security, supply chain security, and SBOM requirements.',
-                'source': 'NIST CSRC (Demo)',
-                'content': 'This publication provides updated guidance for implementing secure software development practices, with enhanced focus on CI/CD pipeline security, supply chain security, SBOM requirements, container security, and DevOps integration.'
-            },
-            {
-                'title': 'NIST Cybersecurity Framework 2.0: Updated Implementation Guidance',
-                'url': 'https://csrc.nist.gov/cyberframework/framework',
-                'date': '2024-11-15',
-                'summary': 'Major update to the NIST Cybersecurity Framework with new guidance for cloud environments, IoT security, and supply chain risk management.',
-                'source': 'NIST CSRC (Demo)',
-                'content': 'The updated framework includes new core functions for cybersecurity governance, cloud security guidance, supply chain subcategories, and expanded coverage for operational technology and IoT.'
-            },
-            {
-                'title': 'NIST SP 800-53 Rev 5: Security Controls for Federal Information Systems',
-                'url': 'https://csrc.nist.gov/publications/detail/sp/800-53/rev-5/final',
-                'date': '2024-10-30',
-                'summary': 'Updated security controls with new guidance for DevOps, cloud computing, and mobile device security.',
-                'source': 'NIST CSRC (Demo)',
-                'content': 'Security controls for software development environments including continuous monitoring requirements, automated security testing integration, configuration management controls, and access control for development environments.'
-            }
-        ]
-        return demo_articles[:limit]
+        # Copy so downstream steps can annotate articles without touching the constants
+        return [dict(article) for article in DEMO_NIST_ARTICLES[:limit]]
     
     async def _search_nist_csrc(self, term: str, limit: int) -> List[Dict]:
         """Search NIST CSRC website directly using web scraping"""
         articles = []
         
+        cache_key = ('csrc', term, limit)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         # Use the main NIST search page
         search_url = f"https://csrc.nist.gov/search?q={term.replace(' ', '+')}"
         
         try:
-            response = self.session.get(search_url, timeout=30, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
+            async with self._search_semaphore:
+                response = await self._get(search_url)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for search results
-            search_results = soup.find_all(['div', 'article'], class_=lambda x: x and ('result' in x.lower() or 'publication' in x.lower()))
-            
-            # If no specific results found, look for any links to publications
-            if not search_results:
-                search_results = soup.find_all('a', href=lambda x: x and '/publications/' in x)
-            
-            count = 0
-            for result in search_results:
-                if count >= limit:
-                    break
-                    
-                # Extract title and link
-                if result.name == 'a':
-                    title = result.get_text(strip=True)
-                    link = result.get('href', '')
-                else:
-                    title_elem = result.find(['h1', 'h2', 'h3', 'h4', 'a'])
-                    if title_elem:
-                        title = title_elem.get_text(strip=True)
-                        link_elem = result.find('a', href=True)
-                        link = link_elem.get('href', '') if link_elem else ''
-                    else:
-                        continue
-                
-                # Clean up the link
-                if link and not link.startswith('http'):
-                    link = f"{Config.NIST_BASE_URL}{link}"
-                
-                # Filter for relevant publications
-                if title and len(title) > 10 and any(keyword in title.lower() for keyword in ['sp 800', 'special publication', 'cybersecurity', 'framework']):
-                    article = {
-                        'title': title,
-                        'url': link,
-                        'date': datetime.now().strftime('%Y-%m-%d'),
-                        'summary': f'NIST publication related to {term}',
-                        'source': 'NIST CSRC'
-                    }
-                    articles.append(article)
-                    count += 1
+            # Parse off the event loop so concurrent fetches keep overlapping
+            articles = await asyncio.to_thread(
+                self._parse_search_results, response.content, response.encoding, term, limit
+            )
+            # An empty page is usually a bot check or outage; retry it on the next run
+            if articles:
+                self.cache.set(cache_key, articles, expire=Config.CACHE_TTL_SECONDS)
                     
         except Exception as e:
             logger.error(f"NIST web scraping failed for {term}: {e}")
             
         return articles
     
+    @staticmethod
+    def _parse_search_results(body: bytes, encoding: Optional[str], term: str, limit: int) -> List[Dict]:
+        """Extract publication articles from a NIST CSRC search results page"""
+        articles = []
+        
+        tree = LexborHTMLParser(_decode_html(body, encoding))
+        
+        # Look for search results
+        search_results = tree.css(
+            'div[class*="result" i], div[class*="publication" i], '
+            'article[class*="result" i], article[class*="publication" i]'
+        )
+        
+        # If no specific results found, look for any links to publications
+        if not search_results:
+            search_results = tree.css('a[href*="/publications/"]')
+        
+        today = datetime.now().strftime('%Y-%m-%d')
+        count = 0
+        for result in search_results:
+            if count >= limit:
+                break
+                
+            # Extract title and link
+            if result.tag == 'a':
+                title = result.text(strip=True)
+                link = result.attributes.get('href') or ''
+            else:
+                title_elem = result.css_first('h1, h2, h3, h4, a')
+                if title_elem is not None:
+                    title = title_elem.text(strip=True)
+                    link_elem = result.css_first('a[href]')
+                    link = (link_elem.attributes.get('href') or '') if link_elem is not None else ''
+                else:
+                    continue
+            
+            # Clean up the link
+            if link and not link.startswith('http'):
+                link = f"{Config.NIST_BASE_URL}{link}"
+            
+            # Filter for relevant publications
+            if title and len(title) > 10 and PUBLICATION_TITLE_RE.search(title):
+                article = {
+                    'title': title,
+                    'url': link,
+                    'date': today,
+                    'summary': f'NIST publication related to {term}',
+                    'source': 'NIST CSRC'
+                }
+                articles.append(article)
+                count += 1
+                
+        return articles
+    
     async def _google_search_nist(self, query: str, limit: int) -> List[Dict]:
         """Fallback Google Custom Search for NIST updates"""
         articles = []
@@ -189,10 +362,10 @@ class NISTComplianceAgent:
         }
         
         try:
-            response = self.session.get(url, params=params, timeout=30)
+            response = await self._get(url, params=params)
             response.raise_for_status()
             
-            data = response.json()
+            data = orjson.loads(response.content)
             
             for item in data.get('items', [])[:limit]:
                 article = {
@@ -215,35 +388,55 @@ class NISTComplianceAgent:
         """
         logger.info(f"Searching for NIST updates on topic: {topic}")
         
-        search_terms = Config.NIST_SEARCH_TERMS.copy()
+        if not Config.USE_LIVE_SOURCES:
+            logger.info("Live sources disabled, using demo data")
+            return await self._get_demo_nist_data(max_results)
+        
+        search_terms = Config.NIST_SEARCH_TERMS
         if topic:
-            search_terms.append(topic)
+            search_terms += (topic,)
             
-        articles = []
-        
-        # Try to search real NIST sources first
-        for term in search_terms[:3]:  # Limit to avoid rate limiting
-            try:
-                nist_articles = await self._search_nist_csrc(term, max_results // 3)
-                articles.extend(nist_articles)
-                if len(articles) >= max_results:
-                    break
-            except Exception as e:
-                logger.error(f"Error searching NIST CSRC for {term}: {e}")
+        # The same publication often matches several terms; keep the first copy per URL
+        seen: Dict[str, Dict] = {}
+        found = 0
+        
+        def add_unique(new_articles: List[Dict]):
+            nonlocal found
+            found += len(new_articles)
+            for article in new_articles:
+                key = article.get('url', '').rstrip('/').lower() or article.get('title', '')
+                seen.setdefault(key, article)
+        
+        # Try to search real NIST sources first, all terms concurrently
+        terms = search_terms[:3]  # Limit to avoid rate limiting
+        results = await asyncio.gather(
+            *(self._search_nist_csrc(term, max_results // 3) for term in terms),
+            return_exceptions=True
+        )
+        for term, result in zip(terms, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error searching NIST CSRC for {term}: {result}")
+            else:
+                add_unique(result)
                     
         # Use Google Custom Search as fallback if we have API keys
-        if len(articles) < max_results and Config.GOOGLE_API_KEY and Config.SEARCH_ENGINE_ID:
+        if len(seen) < max_results and Config.GOOGLE_API_KEY and Config.SEARCH_ENGINE_ID:
             try:
-                google_articles = await self._google_search_nist(topic, max_results - len(articles))
-                articles.extend(google_articles)
+                google_articles = await self._google_search_nist(topic, max_results - len(seen))
+                add_unique(google_articles)
             except Exception as e:
                 logger.error(f"Error with Google search: {e}")
         
+        logger.info(f"Found {len(seen)} unique articles from real sources ({found - len(seen)} duplicates dropped)")
+        
         # CRITICAL FIX: Always fall back to demo data if we don't have enough articles
-        if len(articles) < max_results:
-            logger.warning(f"Only found {len(articles)} articles from real sources, using demo data to fill remaining {max_results - len(articles)}")
-            demo_articles = await self._get_demo_nist_data(max_results - len(articles))
-            articles.extend(demo_articles)
+        if len(seen) < max_results:
+            logger.warning(f"Only found {len(seen)} articles from real sources, using demo data to fill remaining {max_results - len(seen)}")
+            # Take every demo article so ones duplicating a real result don't leave a gap
+            demo_articles = await self._get_demo_nist_data(len(DEMO_NIST_ARTICLES))
+            add_unique(demo_articles)
+        
+        articles = list(seen.values())
         
         # If still no articles, use demo data entirely
         if len(articles) == 0:
@@ -256,22 +449,22 @@ class NISTComplianceAgent:
         """Extract full content from articles in Markdown format"""
         logger.info(f"Extracting content from {len(articles)} articles")
         
-        extracted_articles = []
+        # If content already exists (demo data), keep it; fetch the rest concurrently
+        pending = [article for article in articles if not article.get('content')]
         
-        for article in articles:
-            try:
-                # If content already exists (demo data), keep it
-                if 'content' in article and article['content']:
-                    extracted_articles.append(article)
-                else:
-                    content = await self._extract_single_article(article)
-                    if content:
-                        article['content'] = content
-                        extracted_articles.append(article)
-            except Exception as e:
-                logger.error(f"Failed to extract content from {article.get('url', 'Unknown URL')}: {e}")
+        async def worker(article: Dict) -> str:
+            async with self._extract_semaphore:
+                return await self._extract_single_article(article)
+        
+        contents = await asyncio.gather(*(worker(article) for article in pending), return_exceptions=True)
+        
+        for article, content in zip(pending, contents):
+            if isinstance(content, Exception):
+                logger.error(f"Failed to extract content from {article.get('url', 'Unknown URL')}: {content}")
+            elif content:
+                article['content'] = content
                 
-        return extracted_articles
+        return [article for article in articles if article.get('content')]
     
     async def _extract_single_article(self, article: Dict) -> str:
         """Extract content from a single article"""
@@ -279,85 +472,171 @@ class NISTComplianceAgent:
         if not url:
             return ""
             
-        try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove navigation, ads, etc.
-            for element in soup(['nav', 'header', 'footer', 'aside', 'script', 'style']):
-                element.decompose()
-                
-            # Extract main content
-            content_selectors = [
-                'main', 'article', '.content', '.post-content', 
-                '.entry-content', '#content', '.publication-detail'
-            ]
+        cache_key = ('article', url)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
             
-            main_content = None
-            for selector in content_selectors:
-                main_content = soup.select_one(selector)
-                if main_content:
-                    break
-                    
-            if not main_content:
-                main_content = soup.find('body')
-                
-            if main_content:
-                # Convert to markdown
-                text = main_content.get_text(separator='\n', strip=True)
+        try:
+            # Stream the body and stop at the size cap instead of buffering whole pages
+            async with self.http.stream('GET', url) as response:
+                response.raise_for_status()
                 
-                # Clean up the text
-                lines = [line.strip() for line in text.split('\n') if line.strip()]
-                content = '\n'.join(lines)
+                content_type = response.headers.get('content-type', 'text/html')
+                if 'html' not in content_type:
+                    logger.info(f"Skipping non-HTML content ({content_type}) at {url}")
+                    self.cache.set(cache_key, "", expire=Config.CACHE_TTL_SECONDS)
+                    return ""
                 
-                return content[:50000]  # Limit content size
+                body = bytearray()
+                async for chunk in response.aiter_bytes(65536):
+                    body += chunk
+                    if len(body) >= Config.MAX_ARTICLE_BYTES:
+                        break
+            
+            # Parse off the event loop so concurrent extractions keep overlapping
+            content = await asyncio.to_thread(self._parse_article, bytes(body), response.encoding)
+            # An empty page is usually a bot check or outage; retry it on the next run
+            if content:
+                self.cache.set(cache_key, content, expire=Config.CACHE_TTL_SECONDS)
+            return content
                 
         except Exception as e:
             logger.error(f"Content extraction failed for {url}: {e}")
             
         return ""
     
+    @classmethod
+    def _parse_article(cls, body: bytes, encoding: Optional[str] = None) -> str:
+        """Extract the main text content from an article page"""
+        return cls._extract_main_text(_decode_html(body, encoding))
+    
+    @staticmethod
+    def _extract_main_text(html: str) -> str:
+        """Extract text from the highest-priority content container in an HTML document"""
+        tree = LexborHTMLParser(html)
+        
+        # Remove navigation, ads, etc.
+        tree.strip_tags(['nav', 'header', 'footer', 'aside', 'script', 'style'])
+            
+        # Extract main content: the first selector with a match wins
+        for selector in ARTICLE_CONTENT_SELECTORS:
+            main_content = tree.css_first(selector)
+            if main_content is not None:
+                break
+        else:
+            main_content = tree.body
+            
+        if main_content is None:
+            return ""
+            
+        # Convert to markdown
+        text = main_content.text(separator='\n', strip=True)
+        
+        # Clean up the text in a single pass
+        content = '\n'.join(filter(None, (line.strip() for line in text.split('\n'))))
+        
+        return content[:50000]  # Limit content size
+    
     async def filter_it_relevant_content(self, articles: List[Dict]) -> List[Dict]:
         """Filter content for IT/software development relevance"""
         logger.info(f"Filtering {len(articles)} articles for IT relevance")
         
         filtered_articles = []
         
-        for article in articles:
-            try:
-                relevance_score = await self._assess_it_relevance(article)
-                if relevance_score > 0.7:  # Threshold for relevance
-                    article['relevance_score'] = relevance_score
-                    filtered_articles.append(article)
-            except Exception as e:
-                logger.error(f"Error filtering article {article.get('title', 'Unknown')}: {e}")
+        scores = await self._score_articles(articles)
+        for article, relevance_score in zip(articles, scores):
+            if relevance_score > 0.7:  # Threshold for relevance
+                article['relevance_score'] = relevance_score
+                filtered_articles.append(article)
                 
         logger.info(f"Filtered to {len(filtered_articles)} relevant articles")
         return filtered_articles
     
     async def _assess_it_relevance(self, article: Dict) -> float:
         """Assess IT/software development relevance using AI"""
-        # Force keyword-based relevance for testing (bypassing OpenAI quota issues)
-        logger.info("Using keyword-based relevance scoring")
-        return self._keyword_based_relevance(article)
+        return (await self._score_articles([article]))[0]
+    
+    async def _score_articles(self, articles: List[Dict]) -> List[float]:
+        """Score a batch of articles with at most one AI call; unscorable articles get 0.0"""
+        if Config.USE_AI_ANALYSIS and self.openai_client:
+            scores = await self._ai_relevance_scores(articles)
+        else:
+            logger.info("Using keyword-based relevance scoring")
+            scores = [None] * len(articles)
+        
+        # Anything the AI did not score falls back to keywords
+        for i, article in enumerate(articles):
+            if scores[i] is None:
+                try:
+                    scores[i] = self._keyword_based_relevance(article)
+                except Exception as e:
+                    logger.error(f"Error filtering article {article.get('title', 'Unknown')}: {e}")
+                    scores[i] = 0.0
+        return scores
+    
+    async def _ai_relevance_scores(self, articles: List[Dict]) -> List[Optional[float]]:
+        """Score articles from the judgment cache, sending every miss in a single request"""
+        items = [
+            {
+                'title': article.get('title', ''),
+                'summary': article.get('summary', ''),
+                'content': (article.get('content') or '')[:4000]
+            }
+            for article in articles
+        ]
+        # Titles and summaries are stable across runs, so identical articles skip the API
+        keys = [
+            hashlib.sha256(
+                f"{Config.OPENAI_MODEL}|{RELEVANCE_SYSTEM_PROMPT}|".encode() + orjson.dumps(item)
+            ).hexdigest()
+            for item in items
+        ]
+        scores = [self.relevance_cache.get(key) for key in keys]
+        misses = [i for i, score in enumerate(scores) if score is None]
+        if not misses:
+            return scores
+        
+        batch = [{'id': n, **items[i]} for n, i in enumerate(misses, 1)]
+        prompt = (
+            f"Rate each of the {len(batch)} articles below. Return a JSON object "
+            '{"scores": [...]} with one score per article, in id order.\n'
+            + orjson.dumps(batch).decode()
+        )
+        try:
+            response = await asyncio.to_thread(
+                self.openai_client.chat.completions.create,
+                model=Config.OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": RELEVANCE_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0,
+                response_format={"type": "json_object"}
+            )
+            batch_scores = [
+                max(0.0, min(float(score), 1.0))
+                for score in orjson.loads(response.choices[0].message.content)['scores']
+            ]
+            if len(batch_scores) != len(misses):
+                raise ValueError(f"expected {len(misses)} scores, got {len(batch_scores)}")
+        except Exception as e:
+            logger.warning(f"AI relevance scoring failed, using keywords: {e}")
+            return scores
+        
+        for i, score in zip(misses, batch_scores):
+            scores[i] = score
+            self.relevance_cache.set(keys[i], score)
+        return scores
     
     def _keyword_based_relevance(self, article: Dict) -> float:
         """Fallback keyword-based relevance scoring"""
-        text = f"{article.get('title', '')} {article.get('summary', '')} {article.get('content', '')[:1000]}".lower()
-        
-        # More comprehensive keywords with partial matches
-        keywords = [
-            'software', 'development', 'sdlc', 'ci/cd', 'devops', 'pipeline',
-            'container', 'cloud', 'security', 'secure', 'sast', 'dast', 'sbom',
-            'supply chain', 'cui', 'pii', 'authentication', 'access', 'control',
-            'nist', 'framework', 'cybersecurity', 'compliance', 'controls',
-            'sp 800', '800-53', '800-171', '800-218', 'ssdf', 'guidance'
-        ]
+        title = article.get('title', '')
+        summary = article.get('summary', '')
+        content = article.get('content', '')
         
-        matches = sum(1 for keyword in keywords if keyword in text)
-        score = matches / len(keywords)
+        matches = _count_keyword_matches(title, summary, content[:1000])
+        score = matches / len(RELEVANCE_KEYWORDS)
         
         # For demo articles, be more generous
         if 'demo' in article.get('source', '').lower():
@@ -366,7 +645,7 @@ class NISTComplianceAgent:
         # Scale up the score
         final_score = min(score * 3, 1.0)
         
-        logger.info(f"Article '{article.get('title', '')[:50]}...' scored {final_score:.2f} ({matches} matches)")
+        logger.info(f"Article '{title[:50]}...' scored {final_score:.2f} ({matches} matches)")
         
         return final_score
     
@@ -374,29 +653,71 @@ class NISTComplianceAgent:
         """Generate comprehensive summary in Markdown"""
         logger.info(f"Generating summary for {len(articles)} articles")
         
-        # Use fallback summary for consistency
-        return self._generate_fallback_summary(articles)
+        # Template summaries by default for consistent reports; AI writing is opt-in
+        if not (Config.USE_AI_ANALYSIS and self.openai_client):
+            return self._generate_fallback_summary(articles)
+        
+        # Only the article data varies between runs; it goes after the static instructions
+        article_data = orjson.dumps([
+            {
+                'title': article.get('title', ''),
+                'url': article.get('url', ''),
+                'date': article.get('date', ''),
+                'source': article.get('source', ''),
+                'relevance_score': article.get('relevance_score'),
+                'summary': article.get('summary', ''),
+                'content': (article.get('content') or '')[:2000]
+            }
+            for article in articles
+        ]).decode()
+        
+        try:
+            response = await asyncio.to_thread(
+                self.openai_client.chat.completions.create,
+                model=Config.OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": article_data}
+                ],
+                temperature=0.2
+            )
+            report = response.choices[0].message.content.strip()
+        except Exception as e:
+            logger.warning(f"AI summary generation failed, using fallback summary: {e}")
+            return self._generate_fallback_summary(articles)
+        
+        return self._frontmatter(datetime.now(), len(articles)) + report + "\n"
     
-    def _generate_fallback_summary(self, articles: List[Dict]) -> str:
-        """Generate a basic summary if AI fails"""
-        summary = f"""---
+    @staticmethod
+    def _frontmatter(now: datetime, articles_processed: int) -> str:
+        """YAML frontmatter shared by AI and fallback summaries"""
+        return f"""---
 title: "NIST SP 800 Compliance Update Summary"
-date: "{datetime.now().isoformat()}"
-articles_processed: {len(articles)}
+date: "{now.isoformat()}"
+articles_processed: {articles_processed}
 generated_by: "NIST Compliance Workflow Agent"
 ---
 
-# NIST SP 800 Compliance Update Summary
+"""
+    
+    def _generate_fallback_summary(self, articles: List[Dict]) -> str:
+        """Generate a basic summary if AI fails"""
+        # One timestamp so the frontmatter, header and footer agree
+        now = datetime.now()
+        generated = now.strftime('%Y-%m-%d %H:%M:%S')
+        
+        # Accumulate sections and join once instead of re-copying a growing string
+        parts = [self._frontmatter(now, len(articles)), f"""# NIST SP 800 Compliance Update Summary
 
-**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+**Generated:** {generated}
 **Articles Processed:** {len(articles)}
 
 ## Latest Updates
 
-"""
+"""]
         
         for i, article in enumerate(articles, 1):
-            summary += f"""
+            parts.append(f"""
 ### {i}. {article.get('title', 'Untitled')}
 
 - **URL:** {article.get('url', 'N/A')}
@@ -405,9 +726,9 @@ generated_by: "NIST Compliance Workflow Agent"
 - **Relevance Score:** {article.get('relevance_score', 'N/A'):.2f}
 - **Summary:** {article.get('summary', 'N/A')}
 
-"""
+""")
         
-        summary += """
+        parts.append("""
 ## Key Recommendations for IT Teams
 
 Based on the analyzed NIST updates, consider the following actions:
@@ -429,18 +750,18 @@ Based on the analyzed NIST updates, consider the following actions:
 
 ## Source Citations
 
-"""
+""")
         
         for i, article in enumerate(articles, 1):
-            summary += f"{i}. [{article.get('title', 'Untitled')}]({article.get('url', '#')})\n"
+            parts.append(f"{i}. [{article.get('title', 'Untitled')}]({article.get('url', '#')})\n")
         
-        summary += f"""
+        parts.append(f"""
 
 ---
-*This summary was generated automatically by the NIST Compliance Workflow Agent on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*
-"""
+*This summary was generated automatically by the NIST Compliance Workflow Agent on {generated}*
+""")
         
-        return summary
+        return ''.join(parts)
     
     async def publish_to_github(self, summary: str, articles: List[Dict]) -> Dict[str, str]:
         """Publish summary to GitHub repository via Pull Request"""
@@ -454,7 +775,9 @@ Based on the analyzed NIST updates, consider the following actions:
             repo = self.github_client.get_repo(Config.GITHUB_REPO)
             
             # Create branch name
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            now = datetime.now()
+            today = now.strftime('%Y-%m-%d')
+            timestamp = now.strftime('%Y%m%d_%H%M%S')
             branch_name = f"nist-update-{timestamp}"
             
             # Get default branch
@@ -473,21 +796,21 @@ Based on the analyzed NIST updates, consider the following actions:
             # Create or update file
             repo.create_file(
                 path=file_path,
-                message=f"Add NIST compliance update summary - {datetime.now().strftime('%Y-%m-%d')}",
+                message=f"Add NIST compliance update summary - {today}",
                 content=summary,
                 branch=branch_name
             )
             
             # Create pull request
             pr = repo.create_pull(
-                title=f"NIST Compliance Update - {datetime.now().strftime('%Y-%m-%d')}",
+                title=f"NIST Compliance Update - {today}",
                 body=f"""# NIST SP 800 Compliance Update Summary
 
 This automated pull request contains the latest NIST compliance updates relevant to IT software development organizations.
 
 ## Summary
 - **Articles Processed:** {len(articles)}
-- **Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+- **Generated:** {now.strftime('%Y-%m-%d %H:%M:%S')}
 - **File:** `{file_path}`
 
 ## Key Updates
@@ -516,19 +839,15 @@ Generated by NIST Compliance Workflow Agent 🤖
             logger.error(f"GitHub publishing failed: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to publish to GitHub: {str(e)}")
 
-# Initialize the agent only when running as main application
-agent = None
+def get_agent(http_request: Request) -> NISTComplianceAgent:
+    """Provide the agent created during application startup"""
+    return http_request.app.state.agent
 
 @app.post("/workflow/run", response_model=WorkflowResponse)
-async def run_workflow(request: WorkflowRequest):
+async def run_workflow(request: WorkflowRequest, agent: NISTComplianceAgent = Depends(get_agent)):
     """Run the complete NIST compliance workflow"""
     logger.info(f"Starting workflow with request: {request}")
     
-    # Initialize agent if not already done
-    global agent
-    if agent is None:
-        agent = NISTComplianceAgent()
-        
     try:
         # Step 1: Search for NIST updates
         articles = await agent.search_nist_updates(request.topic, request.max_articles)
@@ -578,12 +897,12 @@ async def run_workflow(request: WorkflowRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/health")
-async def health_check():
+async def health_check() -> Dict[str, str]:
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
 @app.get("/")
-async def root():
+async def root() -> Dict:
     """Root endpoint with API information"""
     return {
         "name": "NIST Compliance Workflow",
@@ -613,27 +932,25 @@ if __name__ == "__main__":
     else:
         # Run workflow directly - initialize agent here
         async def cli_workflow():
-            global agent
-            agent = NISTComplianceAgent()
-            
-            # Check if basic functionality is available
-            print(f"Starting NIST Compliance Workflow")
-            print(f"OpenAI API: {'Configured' if agent.openai_client else 'Not configured (will use fallbacks)'}")
-            print(f"GitHub API: {'Configured' if agent.github_client else 'Not configured (no PR will be created)'}")
-            print(f"Topic: {args.topic or 'Default NIST search terms'}")
-            print(f"Max articles: {args.max_articles}")
-            print("-" * 50)
+            async with NISTComplianceAgent() as agent:
+                # Check if basic functionality is available
+                print(f"Starting NIST Compliance Workflow")
+                print(f"OpenAI API: {'Configured' if agent.openai_client else 'Not configured (will use fallbacks)'}")
+                print(f"GitHub API: {'Configured' if agent.github_client else 'Not configured (no PR will be created)'}")
+                print(f"Topic: {args.topic or 'Default NIST search terms'}")
+                print(f"Max articles: {args.max_articles}")
+                print("-" * 50)
+                    
+                request = WorkflowRequest(topic=args.topic, max_articles=args.max_articles)
+                result = await run_workflow(request, agent)
                 
-            request = WorkflowRequest(topic=args.topic, max_articles=args.max_articles)
-            result = await run_workflow(request)
+                print("-" * 50)
+                print(f"Workflow completed successfully!")
+                print(f"Status: {result.status}")
+                print(f"Articles processed: {result.articles_processed}")
+                print(f"Summary URL: {result.summary_url}")
+                print(f"PR URL: {result.pr_url}")
+                print("-" * 50)
+                print("NIST Compliance Workflow finished!")
             
-            print("-" * 50)
-            print(f"Workflow completed successfully!")
-            print(f"Status: {result.status}")
-            print(f"Articles processed: {result.articles_processed}")
-            print(f"Summary URL: {result.summary_url}")
-            print(f"PR URL: {result.pr_url}")
-            print("-" * 50)
-            print("NIST Compliance Workflow finished!")
-        
         asyncio.run(cli_workflow())
\ No newline at end of file
@@ -5,10 +5,15 @@ Complete end-to-end demonstration
 """
 
 import asyncio
+import logging
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from typing import List, Dict
 import os
 
+logger = logging.getLogger(__name__)
+
 # Demo NIST articles with realistic content
 DEMO_ARTICLES = [
     {
@@ -37,36 +42,59 @@ DEMO_ARTICLES = [
     }
 ]
 
+# Keywords used for relevance scoring
+KEYWORDS = (
+    'software', 'development', 'security', 'devops', 'ci/cd',
+    'pipeline', 'container', 'cloud', 'framework', 'controls'
+)
+
 def assess_relevance(article: Dict) -> float:
     """Simple keyword-based relevance scoring"""
     text = f"{article.get('title', '')} {article.get('summary', '')} {article.get('content', '')}".lower()
     
-    keywords = [
-        'software', 'development', 'security', 'devops', 'ci/cd', 
-        'pipeline', 'container', 'cloud', 'framework', 'controls'
-    ]
+    # Plain substring scans rather than one regex alternation: they also match
+    # inflections ('pipeline' in 'pipelines') and are several times faster
+    matches = sum(1 for keyword in KEYWORDS if keyword in text)
+    score = matches / len(KEYWORDS)
     
-    matches = sum(1 for keyword in keywords if keyword in text)
-    score = matches / len(keywords)
-    
-    print(f"  Article: {article['title'][:50]}...")
-    print(f"  Matches: {matches}/{len(keywords)} keywords")
-    print(f"  Score: {score:.2f}")
+    # Skip formatting three per-article strings when debug output is off
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"  Article: {article['title'][:50]}...")
+        logger.debug(f"  Matches: {matches}/{len(KEYWORDS)} keywords")
+        logger.debug(f"  Score: {score:.2f}")
     
     return score
 
+# Scoring an article takes microseconds, so a process pool only pays for its
+# start-up and pickling cost on large batches
+PARALLEL_SCORING_THRESHOLD = 1000
+
+def score_articles(articles: List[Dict]) -> List[float]:
+    """Score articles for relevance, across processes for large batches"""
+    workers = os.cpu_count() or 1
+    if len(articles) < PARALLEL_SCORING_THRESHOLD or workers == 1:
+        return [assess_relevance(article) for article in articles]
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(assess_relevance, articles, chunksize=max(1, len(articles) // (4 * workers))))
+
 def generate_summary(articles: List[Dict]) -> str:
     """Generate comprehensive summary"""
-    summary = f"""---
+    # One timestamp so the frontmatter, header and footer agree
+    now = datetime.now()
+    generated = now.strftime('%Y-%m-%d %H:%M:%S')
+    
+    # Accumulate sections and join once instead of re-copying a growing string
+    parts = [f"""---
 title: "NIST SP 800 Compliance Update Summary"
-date: "{datetime.now().isoformat()}"
+date: "{now.isoformat()}"
 articles_processed: {len(articles)}
 generated_by: "NIST Compliance Workflow Agent"
 ---
 
 # NIST SP 800 Compliance Update Summary
 
-**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+**Generated:** {generated}
 **Articles Processed:** {len(articles)}
 
 ## Executive Summary
@@ -75,10 +103,10 @@ This report summarizes the latest NIST SP 800-series publications relevant to IT
 
 ## Latest Updates
 
-"""
+"""]
     
     for i, article in enumerate(articles, 1):
-        summary += f"""
+        parts.append(f"""
 ### {i}. {article['title']}
 
 - **Publication Date:** {article['date']}
@@ -93,9 +121,9 @@ This report summarizes the latest NIST SP 800-series publications relevant to IT
 - Updated authentication and access control requirements
 - Container and cloud security best practices
 
-"""
+""")
     
-    summary += """
+    parts.append("""
 ## Action Items for Software Development Teams
 
 ### Immediate Actions (0-30 days)
@@ -197,12 +225,12 @@ This report summarizes the latest NIST SP 800-series publications relevant to IT
 
 ## Source Citations
 
-"""
+""")
     
     for i, article in enumerate(articles, 1):
-        summary += f"{i}. [{article['title']}]({article['url']})\n"
+        parts.append(f"{i}. [{article['title']}]({article['url']})\n")
     
-    summary += f"""
+    parts.append(f"""
 
 ## Next Steps
 
@@ -219,20 +247,20 @@ This report summarizes the latest NIST SP 800-series publications relevant to IT
 - For NIST guidance clarification: Contact NIST directly
 - For implementation support: Consult with cybersecurity professionals
 
-*This summary was automatically generated by the NIST Compliance Workflow Agent on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}. For the most current information, always refer to the original NIST publications.*
-"""
+*This summary was automatically generated by the NIST Compliance Workflow Agent on {generated}. For the most current information, always refer to the original NIST publications.*
+""")
     
-    return summary
+    return ''.join(parts)
 
 async def simulate_github_publishing(summary: str, articles: List[Dict]) -> Dict:
     """Simulate GitHub PR creation"""
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     
     # In a real implementation, this would create an actual GitHub PR
-    print("Simulating GitHub PR creation...")
-    print(f"  Branch: nist-update-{timestamp}")
-    print(f"  File: reports/nist-compliance-{timestamp}.md")
-    print(f"  Summary length: {len(summary)} characters")
+    logger.info("Simulating GitHub PR creation...")
+    logger.info(f"  Branch: nist-update-{timestamp}")
+    logger.info(f"  File: reports/nist-compliance-{timestamp}.md")
+    logger.info(f"  Summary length: {len(summary)} characters")
     
     return {
         'summary_url': f"https://github.com/your-org/nist-compliance/blob/nist-update-{timestamp}/reports/nist-compliance-{timestamp}.md",
@@ -253,43 +281,38 @@ async def run_complete_workflow(topic: str = "cybersecurity framework", max_arti
     print()
     
     # Step 1: Load demo articles
-    print("Step 1: Loading NIST articles...")
+    logger.info("Step 1: Loading NIST articles...")
     articles = DEMO_ARTICLES[:max_articles]
-    print(f"  ✅ Loaded {len(articles)} demo articles")
-    print()
+    logger.info(f"  ✅ Loaded {len(articles)} demo articles")
     
     # Step 2: Extract content (already have content)
-    print("Step 2: Processing article content...")
-    print(f"  ✅ Content ready for {len(articles)} articles")
-    print()
+    logger.info("Step 2: Processing article content...")
+    logger.info(f"  ✅ Content ready for {len(articles)} articles")
     
     # Step 3: Assess relevance
-    print("Step 3: Assessing IT relevance...")
+    logger.info("Step 3: Assessing IT relevance...")
     relevant_articles = []
-    for article in articles:
-        score = assess_relevance(article)
+    # Scoring may start a process pool, so keep it off the event loop
+    scores = await asyncio.get_running_loop().run_in_executor(None, score_articles, articles)
+    for article, score in zip(articles, scores):
         if score > 0.5:  # Relevance threshold
             article['relevance_score'] = score
             relevant_articles.append(article)
-            print(f"  ✅ Article is relevant")
+            logger.debug("  ✅ Article is relevant")
         else:
-            print(f"  ❌ Article not relevant")
-        print()
+            logger.debug("  ❌ Article not relevant")
     
-    print(f"  📊 Result: {len(relevant_articles)}/{len(articles)} articles are relevant")
-    print()
+    logger.info(f"  📊 Result: {len(relevant_articles)}/{len(articles)} articles are relevant")
     
     # Step 4: Generate summary
-    print("Step 4: Generating comprehensive summary...")
+    logger.info("Step 4: Generating comprehensive summary...")
     summary = generate_summary(relevant_articles)
-    print(f"  ✅ Generated {len(summary)} character summary")
-    print()
+    logger.info(f"  ✅ Generated {len(summary)} character summary")
     
     # Step 5: Simulate GitHub publishing
-    print("Step 5: Publishing to GitHub...")
+    logger.info("Step 5: Publishing to GitHub...")
     github_result = await simulate_github_publishing(summary, relevant_articles)
-    print(f"  ✅ PR created: {github_result['pr_url']}")
-    print()
+    logger.info(f"  ✅ PR created: {github_result['pr_url']}")
     
     # Results
     print("=" * 60)
@@ -315,6 +338,7 @@ async def run_complete_workflow(topic: str = "cybersecurity framework", max_arti
     }
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout, format="%(message)s")
     result = asyncio.run(run_complete_workflow("cybersecurity framework", 3))
     
     print("\n🎉 DEMONSTRATION COMPLETE!")